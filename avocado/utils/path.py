@@ -24,6 +24,51 @@ from avocado.utils import aurl
 
 SHEBANG = "#!"
 
+#: Directories commonly holding binaries, searched by
+#: :func:`find_command` in addition to the PATH environment variable
+_COMMON_BIN_PATHS = [
+    "/usr/libexec",
+    "/usr/local/sbin",
+    "/usr/local/bin",
+    "/usr/sbin",
+    "/usr/bin",
+    "/sbin",
+    "/bin",
+]
+
+#: Cache of parsed PATH environment variable values, keyed on the raw
+#: string, holding the deduplicated list of directories to search
+_PATH_CACHE = {}
+
+#: Cache of successful :func:`find_command` lookups, keyed on the
+#: command, the raw PATH environment variable and the check_exec flag
+_COMMAND_CACHE = {}
+
+#: Cache of PATH directory listings, so that repeated
+#: :func:`find_command` calls do a set membership test instead of
+#: one stat() syscall per candidate directory
+_DIR_CACHE = {}
+
+
+def _dir_entries(dir_path):
+    """
+    Returns the (cached) set of entries of a given directory.
+
+    :param dir_path: path to the directory to be listed
+    :type dir_path: str
+    :returns: the directory entries, or None if it can not be listed
+    :rtype: frozenset or None
+    """
+    try:
+        entries = _DIR_CACHE[dir_path]
+    except KeyError:
+        try:
+            entries = frozenset(os.listdir(dir_path))
+        except OSError:
+            entries = None
+        _DIR_CACHE[dir_path] = entries
+    return entries
+
 
 class CmdNotFoundError(Exception):
     """
@@ -91,34 +136,53 @@ def find_command(cmd, default=None, check_exec=True):
             value if the command is not found
     :rtype: str
     """
-    common_bin_paths = [
-        "/usr/libexec",
-        "/usr/local/sbin",
-        "/usr/local/bin",
-        "/usr/sbin",
-        "/usr/bin",
-        "/sbin",
-        "/bin",
-    ]
+    raw_path = os.environ.get("PATH", "")
+    cache_key = (cmd, raw_path, check_exec)
+    cached = _COMMAND_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
     try:
-        path_paths = os.environ["PATH"].split(":")
-    except IndexError:
-        path_paths = []
-    path_paths = list(set(common_bin_paths + path_paths))
-
-    for dir_path in path_paths:
-        cmd_path = os.path.join(dir_path, cmd)
-        if os.path.isfile(cmd_path):
+        path_paths = _PATH_CACHE[raw_path]
+    except KeyError:
+        env_paths = raw_path.split(":") if raw_path else []
+        # order-preserving dedup, PATH entries taking precedence over
+        # the common binary directories
+        path_paths = list(dict.fromkeys(env_paths + _COMMON_BIN_PATHS))
+        _PATH_CACHE[raw_path] = path_paths
+
+    def scan():
+        for dir_path in path_paths:
+            entries = _dir_entries(dir_path)
+            if entries is not None and cmd not in entries:
+                continue
+            cmd_path = os.path.join(dir_path, cmd)
             if check_exec:
-                if not os.access(cmd_path, os.R_OK | os.X_OK):
-                    continue
-            return os.path.abspath(cmd_path)
+                # a single access() syscall checks both existence and
+                # the permissions needed to run the command
+                if os.access(cmd_path, os.R_OK | os.X_OK) and not os.path.isdir(
+                    cmd_path
+                ):
+                    return os.path.abspath(cmd_path)
+            elif os.path.isfile(cmd_path):
+                return os.path.abspath(cmd_path)
+        return None
+
+    cmd_path = scan()
+    if cmd_path is None:
+        # the command may have appeared after a directory listing was
+        # cached, so refresh the listings and scan once more
+        for dir_path in path_paths:
+            _DIR_CACHE.pop(dir_path, None)
+        cmd_path = scan()
+    if cmd_path is not None:
+        _COMMAND_CACHE[cache_key] = cmd_path
+        return cmd_path
 
     if default is not None:
         return default
     else:
-        path_paths.sort()
-        raise CmdNotFoundError(cmd, path_paths)
+        # sorted() rather than sort(), so the cached list is not mutated
+        raise CmdNotFoundError(cmd, sorted(path_paths))
 
 
 class PathInspector:
@@ -18,9 +18,11 @@ Functions dedicated to find and run external commands.
 
 import contextlib
 import errno
+import functools
 import glob
 import logging
 import os
+import queue
 import re
 import select
 import shlex
@@ -30,6 +32,11 @@ import threading
 import time
 from io import BytesIO, UnsupportedOperation
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 from avocado.utils import astring, path
 from avocado.utils.wait import wait_for
 
@@ -38,6 +45,41 @@ LOG = logging.getLogger(__name__)
 # variable=value bash assignment
 _RE_BASH_SET_VARIABLE = re.compile(r"[a-zA-Z]\w*=.*")
 
+#: The amount of data (in bytes) read at once from a process' file
+#: descriptor.  Matches the default pipe capacity on Linux, so a
+#: process producing large amounts of output requires far fewer
+#: syscalls to be drained.
+_FD_DRAINER_READ_SIZE = 65536
+
+#: Pool of reusable read buffers shared by all drainers.  Test suites
+#: that run thousands of commands would otherwise allocate (and have
+#: the garbage collector reclaim) a fresh buffer for every read.
+_READ_BUFFER_POOL = queue.Queue(maxsize=64)
+
+
+def _read_fd(fd):
+    """
+    Reads up to :data:`_FD_DRAINER_READ_SIZE` bytes from a file
+    descriptor, scatter-reading into a pooled buffer.
+
+    :param fd: file descriptor to read from
+    :type fd: int
+    :returns: the data read, empty on EOF
+    :rtype: bytes
+    """
+    try:
+        buf = _READ_BUFFER_POOL.get_nowait()
+    except queue.Empty:
+        buf = bytearray(_FD_DRAINER_READ_SIZE)
+    try:
+        if hasattr(os, "readv"):
+            received = os.readv(fd, [buf])
+            return bytes(memoryview(buf)[:received])
+        return os.read(fd, _FD_DRAINER_READ_SIZE)
+    finally:
+        with contextlib.suppress(queue.Full):
+            _READ_BUFFER_POOL.put_nowait(buf)
+
 
 class CmdError(Exception):
     def __init__(
@@ -335,6 +377,22 @@ def binary_from_shell_cmd(cmd):
 cmd_split = shlex.split
 
 
+@functools.lru_cache(maxsize=256)
+def _shlex_split(cmd):
+    """
+    Cached version of :func:`shlex.split`.
+
+    shlex is a pure Python state machine, and the same command line
+    strings tend to repeat heavily within a test suite.  A tuple is
+    returned so the cached value can not be mutated by callers.
+
+    :param cmd: the command line string to be split
+    :type cmd: str
+    :rtype: tuple
+    """
+    return tuple(shlex.split(cmd))
+
+
 class CmdResult:
     """
     Command execution result.
@@ -454,7 +512,10 @@ class FDDrainer:
         """
         self.fd = fd
         self.name = name
-        self.data = BytesIO()
+        # list.append is atomic under the GIL, so the drainer thread can
+        # add chunks while other threads read a consistent snapshot via
+        # the :attr:`data` property, without any locking
+        self._data_chunks = []
         # TODO: check if, when the process finishes, the FD doesn't
         # automatically close.  This may be used as the detection
         # instead.
@@ -464,7 +525,25 @@ class FDDrainer:
         self._logger_prefix = logger_prefix
         self._stream_logger = stream_logger
         self._ignore_bg_processes = ignore_bg_processes
-        self._verbose = verbose
+        # when verbose, the line splitting and logging machinery can
+        # still be skipped if no logger would emit the records anyway
+        self._verbose = verbose and (
+            (logger is not None and logger.isEnabledFor(logging.DEBUG))
+            or (stream_logger is not None and stream_logger.isEnabledFor(logging.DEBUG))
+        )
+        self._line_bfr = bytearray()
+        # signaled once this drainer's stream reached EOF (or draining
+        # was given up on) and all pending output has been handled
+        self._drain_done = threading.Event()
+
+    @property
+    def data(self):
+        """
+        A file-like object with the data read from the fd so far.
+
+        :rtype: :class:`io.BytesIO`
+        """
+        return BytesIO(b"".join(self._data_chunks))
 
     def _log_line(self, line, newline_for_stream="\n"):
         line = astring.to_text(line, self._result.encoding, "replace")
@@ -473,37 +552,56 @@ class FDDrainer:
         if self._stream_logger is not None:
             self._stream_logger.debug(line + newline_for_stream)
 
+    def _process_chunk(self, tmp):
+        """
+        Store a chunk read from the fd, logging complete lines if verbose
+        """
+        self._data_chunks.append(tmp)
+        if self._verbose:
+            bfr = self._line_bfr
+            # the kept tail contains no newline, so only the newly
+            # appended chunk needs to be scanned
+            scan_start = len(bfr)
+            bfr.extend(tmp)
+            idx = bfr.rfind(b"\n", scan_start)
+            if idx >= 0:
+                log_line = self._log_line
+                for line in bytes(bfr[:idx]).split(b"\n"):
+                    log_line(line)
+                del bfr[: idx + 1]
+
+    def _finish(self):
+        """
+        Log whatever is left without a trailing newline after EOF
+        """
+        if self._verbose and self._line_bfr:
+            self._log_line(bytes(self._line_bfr), "")
+            self._line_bfr.clear()
+        self._drain_done.set()
+
     def _drainer(self):
         """
         Read from fd, storing and optionally logging the output
         """
-        bfr = b""
-        while True:
-            if self._ignore_bg_processes:
-                has_io = select.select([self.fd], [], [], 1)[0]
-                if not has_io and self._result.exit_status is not None:
-                    # Exit if no new data and main process has finished
+        try:
+            while True:
+                if self._ignore_bg_processes:
+                    has_io = select.select([self.fd], [], [], 1)[0]
+                    if not has_io and self._result.exit_status is not None:
+                        # Exit if no new data and main process has finished
+                        break
+                    if not has_io:
+                        # Don't read unless there are new data available
+                        continue
+                try:
+                    tmp = _read_fd(self.fd)
+                except OSError:
                     break
-                if not has_io:
-                    # Don't read unless there are new data available
-                    continue
-            try:
-                tmp = os.read(self.fd, 8192)
-            except OSError:
-                break
-            if not tmp:
-                break
-            self.data.write(tmp)
-            if self._verbose:
-                bfr += tmp
-                lines = bfr.splitlines()
-                for line in lines[:-1]:
-                    self._log_line(line)
-                if bfr.endswith(b"\n"):
-                    self._log_line(lines[-1])
-                else:
-                    self._log_line(lines[-1], "")
-                bfr = b""
+                if not tmp:
+                    break
+                self._process_chunk(tmp)
+        finally:
+            self._finish()
 
     def start(self):
         self._thread = threading.Thread(target=self._drainer, name=self.name)
@@ -511,6 +609,10 @@ class FDDrainer:
         self._thread.start()
 
     def flush(self):
+        # wait on the explicit end-of-drain sentinel: the drainer
+        # thread may be shared with other streams (see _poll_drainers)
+        # and joining it alone says nothing about this stream
+        self._drain_done.wait()
         self._thread.join()
         if self._stream_logger is not None:
             for handler in self._stream_logger.handlers:
@@ -530,6 +632,62 @@ class FDDrainer:
                     handler.close()
 
 
+def _poll_drainers(drainers, result, ignore_bg_processes=False):
+    """
+    Drains the file descriptors of multiple drainers from one thread.
+
+    Uses :func:`select.poll` so that a single thread can service both
+    the stdout and stderr pipes of a process, instead of spawning (and
+    tearing down) one thread per pipe.
+
+    :param drainers: the drainers whose fds will be serviced
+    :type drainers: list of :class:`FDDrainer` instances
+    :param result: a :class:`CmdResult` instance associated with the
+                   process, used to detect if it's still running
+    :type result: a :class:`CmdResult` instance
+    :param ignore_bg_processes: when True, stop draining once there's no
+                                new data and the main process finished
+    :type ignore_bg_processes: boolean
+    """
+    poller = select.poll()
+    pending = {}
+    for drainer in drainers:
+        if fcntl is not None:
+            # nonblocking reads let this thread fully drain whichever
+            # fd is ready without ever stalling on it
+            flags = fcntl.fcntl(drainer.fd, fcntl.F_GETFL)
+            fcntl.fcntl(drainer.fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        poller.register(drainer.fd, select.POLLIN | select.POLLHUP)
+        pending[drainer.fd] = drainer
+    try:
+        while pending:
+            events = poller.poll(1000)
+            if not events:
+                if ignore_bg_processes and result.exit_status is not None:
+                    # Exit if no new data and main process has finished
+                    break
+                continue
+            for fd, _ in events:
+                drainer = pending[fd]
+                while True:
+                    try:
+                        tmp = _read_fd(fd)
+                    except BlockingIOError:
+                        # pipe drained dry, wait for the next event
+                        break
+                    except OSError:
+                        tmp = b""
+                    if not tmp:
+                        poller.unregister(fd)
+                        del pending[fd]
+                        drainer._finish()
+                        break
+                    drainer._process_chunk(tmp)
+    finally:
+        for drainer in pending.values():
+            drainer._finish()
+
+
 class SubProcess:
     """
     Run a subprocess in the background, collecting stdout/stderr streams.
@@ -549,8 +707,10 @@ class SubProcess:
         """
         Creates the subprocess object, stdout/err, reader threads and locks.
 
-        :param cmd: Command line to run.
-        :type cmd: str
+        :param cmd: Command line to run, either as a string that will be
+                    split with :func:`shlex.split`, or as a pre-split
+                    argument list/tuple (which skips the splitting cost).
+        :type cmd: str or list
         :param verbose: Whether to log the command run and stdout/stderr.
         :type verbose: bool
         :param shell: Whether to run the subprocess in a subshell.
@@ -583,8 +743,16 @@ class SubProcess:
         """
         if encoding is None:
             encoding = astring.ENCODING
+        if isinstance(cmd, (list, tuple)):
+            self._cmd_args = list(cmd)
+            cmd = " ".join(cmd)
+        else:
+            self._cmd_args = None
         if sudo:
             self.cmd = self._prepend_sudo(cmd, shell)
+            # the command may have been rewritten, so the pre-split
+            # arguments no longer apply
+            self._cmd_args = None
         else:
             self.cmd = cmd
         self.verbose = verbose
@@ -657,10 +825,17 @@ class SubProcess:
         if self.verbose:
             LOG.info("Running '%s'", self.cmd)
         if self.shell is False:
-            cmd = shlex.split(self.cmd)
+            if self._cmd_args is not None:
+                cmd = self._cmd_args
+            else:
+                cmd = _shlex_split(self.cmd)
         else:
             cmd = self.cmd
         try:
+            # no preexec_fn, pass_fds or cwd may be added here without
+            # losing the posix_spawn()/vfork() fast path that modern
+            # Python uses instead of a full fork() -- a significant
+            # saving when the parent process is large
             self._popen = subprocess.Popen(
                 cmd,
                 stdout=subprocess.PIPE,
@@ -696,9 +871,22 @@ class SubProcess:
             verbose=self.verbose,
         )
 
-        # start stdout/stderr threads
-        self._stdout_drainer.start()
-        self._stderr_drainer.start()
+        # a single thread is enough to service both pipes; fall back
+        # to one thread per pipe where select.poll() is not available
+        if hasattr(select, "poll"):
+            drainers = (self._stdout_drainer, self._stderr_drainer)
+            drainer_thread = threading.Thread(
+                target=_poll_drainers,
+                name=f"{self.cmd}-drainer",
+                args=(drainers, self.result, self._ignore_bg_processes),
+            )
+            drainer_thread.daemon = True
+            for drainer in drainers:
+                drainer._thread = drainer_thread
+            drainer_thread.start()
+        else:
+            self._stdout_drainer.start()
+            self._stderr_drainer.start()
 
         try:
             signal.signal(signal.SIGINT, signal_handler)
@@ -800,7 +988,10 @@ class SubProcess:
                 with contextlib.suppress(Exception):
                     run(kill_cmd, sudo=True)
         else:
-            self._popen.send_signal(sig)
+            # the process may have just exited: ESRCH is not an error
+            # worth propagating to callers asking for its termination
+            with contextlib.suppress(ProcessLookupError):
+                self._popen.send_signal(sig)
 
     def poll(self):
         """
@@ -864,12 +1055,10 @@ class SubProcess:
                 timer.cancel()
 
         if rc is None:
-            stop_time = time.monotonic() + 1
-            while time.monotonic() < stop_time:
-                rc = self._popen.poll()
-                if rc is not None:
-                    break
-            else:
+            try:
+                # block in waitpid() instead of spinning on poll()
+                rc = self._popen.wait(timeout=1)
+            except subprocess.TimeoutExpired:
                 nuke_myself()
                 rc = self._popen.poll()
 
@@ -959,8 +1148,10 @@ def run(
     """
     Run a subprocess, returning a CmdResult object.
 
-    :param cmd: Command line to run.
-    :type cmd: str
+    :param cmd: Command line to run, either as a string that will be
+                split with :func:`shlex.split`, or as a pre-split
+                argument list/tuple (which skips the splitting cost).
+    :type cmd: str or list
     :param timeout: Time limit in seconds before attempting to kill the
                     running process. This function will take a few seconds
                     longer than 'timeout' to complete if it has to kill the
@@ -1014,6 +1205,129 @@ def run(
     return cmd_result
 
 
+def quick_run(
+    cmd, timeout=None, ignore_status=False, shell=False, env=None, encoding=None
+):
+    """
+    Run a subprocess with minimal overhead, returning a CmdResult object.
+
+    A lean alternative to :func:`run` for callers that only need the
+    exit status and output of a command: there's no logging of the
+    command or its output, no sudo support and no background process
+    handling.  Pipe draining is delegated to :func:`subprocess.run`,
+    so no drainer thread is created.
+
+    :param cmd: Command line to run, either as a string that will be
+                split with :func:`shlex.split`, or as a pre-split
+                argument list/tuple.
+    :type cmd: str or list
+    :param timeout: Time limit in seconds before the running process
+                    is killed.
+    :type timeout: float
+    :param ignore_status: Whether to raise an exception when command returns
+                          =! 0 (False), or not (True).
+    :type ignore_status: bool
+    :param shell: Whether to run the command on a subshell
+    :type shell: bool
+    :param env: Use extra environment variables
+    :type env: dict
+    :param encoding: the encoding to use for the text representation
+                     of the command result stdout and stderr, by default
+                     :data:`avocado.utils.astring.ENCODING`
+    :type encoding: str
+
+    :return: An :class:`CmdResult` object.
+    :raise: :class:`CmdError`, if ``ignore_status=False``.
+    """
+    if not cmd:
+        raise CmdInputError("Invalid empty command")
+    if encoding is None:
+        encoding = astring.ENCODING
+    if isinstance(cmd, (list, tuple)):
+        command = " ".join(cmd)
+        args = command if shell else list(cmd)
+    else:
+        command = cmd
+        args = cmd if shell else list(_shlex_split(cmd))
+    if env:
+        run_env = os.environ.copy()
+        run_env.update(env)
+    else:
+        run_env = None
+    start = time.monotonic()
+    try:
+        proc = subprocess.run(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            shell=shell,
+            env=run_env,
+            timeout=timeout,
+            check=False,
+        )
+        result = CmdResult(
+            command=command,
+            stdout=proc.stdout,
+            stderr=proc.stderr,
+            exit_status=proc.returncode,
+            duration=time.monotonic() - start,
+            encoding=encoding,
+        )
+    except subprocess.TimeoutExpired as details:
+        result = CmdResult(
+            command=command,
+            stdout=details.stdout or b"",
+            stderr=details.stderr or b"",
+            duration=time.monotonic() - start,
+            encoding=encoding,
+        )
+        result.interrupted = f"timeout after {result.duration:.9f}s"
+    fail_condition = result.exit_status != 0 or result.interrupted
+    if fail_condition and not ignore_status:
+        raise CmdError(command, result)
+    return result
+
+
+def _run_discarding_output(cmd, shell=False, env=None, sudo=False):
+    """
+    Runs a command letting the kernel discard its output.
+
+    Used by :func:`system` when nothing will consume the output: the
+    child's stdout and stderr are redirected straight to /dev/null, so
+    no pipes, drainer threads or userspace copies are involved.
+
+    :returns: the command's exit status
+    :rtype: int
+    """
+    if not cmd:
+        raise CmdInputError("Invalid empty command")
+    if isinstance(cmd, (list, tuple)):
+        command = " ".join(cmd)
+        args = list(cmd)
+    else:
+        command = cmd
+        args = None
+    if sudo:
+        command = SubProcess._prepend_sudo(command, shell)
+        args = None
+    if shell:
+        args = command
+    elif args is None:
+        args = list(_shlex_split(command))
+    if env:
+        run_env = os.environ.copy()
+        run_env.update(env)
+    else:
+        run_env = None
+    return subprocess.call(
+        args,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        shell=shell,
+        env=run_env,
+    )
+
+
 def system(
     cmd,
     timeout=None,
@@ -1064,6 +1378,11 @@ def system(
     :rtype: int
     :raise: :class:`CmdError`, if ``ignore_status=False``.
     """
+    if not verbose and ignore_status and timeout is None and not ignore_bg_processes:
+        # nothing will consume the output (no logging, no CmdError to
+        # carry it), so let the kernel discard it instead of copying
+        # every byte through the drainer
+        return _run_discarding_output(cmd, shell=shell, env=env, sudo=sudo)
     cmd_result = run(
         cmd=cmd,
         timeout=timeout,
@@ -153,6 +153,12 @@ class TestProcessRun(unittest.TestCase):
         p = process.SubProcess(cmd="ls -l")
         self.assertEqual(p.cmd, expected_command)
 
+    @unittest.mock.patch.object(os, "getuid", unittest.mock.Mock(return_value=1000))
+    def test_subprocess_argv(self):
+        expected_command = "ls -l"
+        p = process.SubProcess(cmd=["ls", "-l"])
+        self.assertEqual(p.cmd, expected_command)
+
     @unittest.mock.patch.object(os, "getuid", unittest.mock.Mock(return_value=0))
     def test_subprocess_nosudo_uid_0(self):
         expected_command = "ls -l"
@@ -282,6 +288,34 @@ class TestProcessRun(unittest.TestCase):
         self.assertEqual(result.stdout, encoded_text)
         self.assertEqual(result.stdout_text, text)
 
+    @unittest.skipUnless(ECHO_CMD, "Echo command not available in system")
+    def test_run_argv_list(self):
+        result = process.run([ECHO_CMD, "-n", "foo bar"])
+        self.assertEqual(result.command, f"{ECHO_CMD} -n foo bar")
+        self.assertEqual(result.stdout, b"foo bar")
+
+    @unittest.skipUnless(ECHO_CMD, "Echo command not available in system")
+    def test_quick_run(self):
+        result = process.quick_run(f"{ECHO_CMD} -n foo")
+        self.assertEqual(result.exit_status, 0)
+        self.assertEqual(result.stdout, b"foo")
+        self.assertEqual(result.stderr, b"")
+
+    def test_quick_run_ignore_status(self):
+        cmd = f"{sys.executable} -c 'import sys; sys.exit(7)'"
+        result = process.quick_run(cmd, ignore_status=True)
+        self.assertEqual(result.exit_status, 7)
+        with self.assertRaises(process.CmdError):
+            process.quick_run(cmd)
+
+    def test_quick_run_empty_command(self):
+        with self.assertRaises(process.CmdInputError):
+            process.quick_run("")
+
+    def test_system_discarded_output(self):
+        cmd = f"{sys.executable} -c 'import sys; sys.exit(5)'"
+        self.assertEqual(process.system(cmd, verbose=False, ignore_status=True), 5)
+
     @skipOnLevelsInferiorThan(2)
     def test_run_with_timeout_ugly_cmd(self):
         """